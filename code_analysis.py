@@ -1,19 +1,30 @@
 from pathlib import Path
-from typing import Optional, List, Dict, Union, Set
+from typing import Optional, List, Dict, Union, Set, Tuple
 from dataclasses import dataclass
+from array import array
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
 from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp.prompts.base import UserMessage, AssistantMessage
+import asyncio
+import errno
+import io
 import os
+import re
+import stat
+import sys
 from pathspec import PathSpec
 from pathspec.patterns import GitWildMatchPattern
+from pathspec.patterns.gitwildmatch import GitWildMatchPatternError
+from pathspec.util import normalize_file
 
-@dataclass
+@dataclass(slots=True)
 class Summary:
     file_count: int = 0
     dir_count: int = 0
     total_size: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class FileStructure:
     path: str
     type: str
@@ -21,86 +32,337 @@ class FileStructure:
     children: Optional[List['FileStructure']] = None
     summary: Optional[Summary] = None
 
+# Shared node type labels, so every node references the same two strings
+_T_FILE = sys.intern('file')
+_T_DIR = sys.intern('directory')
+
+# Directory walk frame: (node to fill, absolute path, relative path, depth)
+_Frame = Tuple[FileStructure, str, str, int]
+
+def _root_prefix(path: Path) -> str:
+    """Resolve a root directory once and return it with a trailing separator."""
+    return os.path.join(os.path.realpath(path), '')
+
+def _is_within_root(resolved: str, root_prefix: str) -> bool:
+    """Check if a resolved path is the root itself or lies beneath it."""
+    return resolved == root_prefix[:-1] or resolved.startswith(root_prefix)
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB')
+_SIZE_MAX_INDEX = len(_SIZE_UNITS) - 1
+
+def _format_size(size: int) -> str:
+    """Format a byte count with a binary unit suffix."""
+    if not size:
+        return "0.0 B"
+    # Each unit spans 10 bits, so the bit length picks it without a loop
+    index = min((size.bit_length() - 1) // 10, _SIZE_MAX_INDEX)
+    return f"{size / (1 << (index * 10)):.1f} {_SIZE_UNITS[index]}"
+
+# Prebuilt indent strings for the common tree levels
+_INDENTS = tuple('  ' * level for level in range(32))
+
+def _format_items(buffer: io.StringIO, structure: FileStructure) -> None:
+    """Write the formatted lines for a structure tree to buffer, one per line."""
+    write = buffer.write
+    stack = [(structure, 0)]
+
+    while stack:
+        item, level = stack.pop()
+        indent = _INDENTS[level] if level < len(_INDENTS) else '  ' * level
+        write(indent)
+
+        if item.type == _T_DIR:
+            write('📁 ')
+            write(item.path)
+            write('/\n')
+
+            if item.summary:
+                summary = item.summary
+                write(indent)
+                write(
+                    f"   Contains: {summary.file_count} files, "
+                    f"{summary.dir_count} directories, "
+                    f"{_format_size(summary.total_size)}\n"
+                )
+            elif item.children:
+                # Push in reverse so children pop in their original order
+                stack.extend((child, level + 1) for child in reversed(item.children))
+        else:
+            write('📄 ')
+            write(item.path)
+            write(' (')
+            write(_format_size(item.size or 0))
+            write(')\n')
+
+def _parse_gitignore(lines: List[str], source: str) -> PathSpec:
+    """Compile gitignore lines into a PathSpec, skipping invalid patterns."""
+    patterns = []
+    for line in lines:
+        if not line:
+            continue
+        try:
+            patterns.append(GitWildMatchPattern(line))
+        except GitWildMatchPatternError as e:
+            print(f"Skipping pattern in {source}: {e}")
+    return PathSpec(patterns)
+
+# Compiled gitignore patterns: a regex for file paths, one for directory keys
+# ending in '/', and the include flag of each capturing group, or None when
+# every match means the path is ignored
+_IgnoreMatcher = Tuple[re.Pattern, re.Pattern, Optional[Tuple[bool, ...]]]
+
+# How pathspec ends the regex of a directory-only pattern such as 'build/'
+_DIR_ONLY_SUFFIX = '(?P<ps_d>/).*$'
+
+def _compile_ignore(spec: PathSpec) -> Optional[_IgnoreMatcher]:
+    """Combine a spec's patterns into single regexes, or None to fall back to PathSpec."""
+    # Alternatives are added in reverse so the first one to match is the last
+    # matching pattern, which decides the outcome as in PathSpec
+    file_fragments = []
+    dir_fragments = []
+    includes = []
+    for pattern in reversed(spec.patterns):
+        if pattern.include is None or pattern.regex is None:
+            continue
+        source = pattern.regex.pattern
+        if not source.endswith('$'):
+            return None
+        # A directory is only matched by patterns matching the entry itself:
+        # its bare name, or for directory-only patterns the name and the '/'
+        # ending the key. So 'foo/**', which matches what is inside foo, does
+        # not match 'foo/' through an empty remainder
+        if source.endswith(_DIR_ONLY_SUFFIX):
+            dir_source = source[:-len(_DIR_ONLY_SUFFIX)] + '/$'
+        else:
+            dir_source = source[:-1] + '/$'
+        # Strip pathspec's own named groups so they don't clash across alternatives
+        file_fragments.append(re.sub(r'\(\?P<[^>]+>', '(?:', source))
+        dir_fragments.append(re.sub(r'\(\?P<[^>]+>', '(?:', dir_source))
+        includes.append(pattern.include)
+
+    if not file_fragments:
+        return None
+
+    # Without negations any match ignores the path, so no groups are needed
+    if all(includes):
+        template = "(?:{})"
+        group_includes = None
+    else:
+        template = "({})"
+        group_includes = (False, *includes)
+
+    try:
+        return (
+            re.compile('|'.join(template.format(fragment) for fragment in file_fragments)),
+            re.compile('|'.join(template.format(fragment) for fragment in dir_fragments)),
+            group_includes
+        )
+    except re.error as e:
+        print(f"Error compiling ignore patterns: {e}")
+        return None
+
+def _bounded_put(cache: Dict, key: str, value, limit: int) -> None:
+    """Store a cache entry, evicting the oldest one once the cache holds limit entries."""
+    if len(cache) >= limit:
+        # Dicts iterate in insertion order, so the first key is the oldest
+        try:
+            cache.pop(next(iter(cache)), None)
+        except (RuntimeError, StopIteration):
+            # Another walker thread changed the cache mid-eviction
+            pass
+    cache[key] = value
+
+def _match_compiled(matcher: _IgnoreMatcher, path: str) -> Optional[bool]:
+    """Return whether the last pattern matching path ignores it, or None if none match."""
+    file_regex, dir_regex, includes = matcher
+    match = (dir_regex if path.endswith('/') else file_regex).match(path)
+    if match is None:
+        return None
+    # The only capturing group that can match is the winning pattern's
+    return includes is None or includes[match.lastindex]
+
 class RepoStructureAnalyzer:
-    def __init__(self, repo_path: Path, max_depth: int = 3, max_children: int = 100):
+    def __init__(
+        self,
+        repo_path: Path,
+        max_depth: int = 3,
+        max_children: int = 100,
+        parallel: bool = True
+    ):
         self.repo_path = repo_path
         self.MAX_DEPTH = max_depth
         self.MAX_CHILDREN = max_children
+
+        # Canonical repository root with trailing separator, resolved once
+        self._resolved_root = _root_prefix(self.repo_path)
+        # Slicing this many characters off an absolute path under the repo
+        # root yields its relative path
+        self._repo_prefix_len = len(os.path.join(str(self.repo_path), ''))
+
+        # Thread pool for scanning directories concurrently; at most
+        # MAX_IN_FLIGHT scans are queued on it at once
+        self.MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+        self.MAX_IN_FLIGHT = self.MAX_WORKERS * 2
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if parallel:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.MAX_WORKERS,
+                thread_name_prefix="repo-walk"
+            )
         
-        # Default patterns to always ignore
+        # Default names to always ignore; they are matched by name rather
+        # than going through the gitignore patterns
         self.default_ignore_patterns = ['.git', '__pycache__', 'node_modules']
+        self._always_ignore_basenames = frozenset(self.default_ignore_patterns)
         
         # Load .gitignore if it exists
+        self.has_gitignore = False
         self.gitignore_spec = self._load_gitignore()
+        self._ignore_matcher = _compile_ignore(self.gitignore_spec)
+
+        # Compiled .gitignore files of subdirectories, keyed by relative
+        # directory path, with None for directories that have none; each is
+        # parsed once, the first time a path below it is checked. Bounded like
+        # the ignore cache; an evicted directory is simply loaded again
+        self.MAX_SPEC_CACHE = 10000
+        self._spec_cache: Dict[str, Optional[_IgnoreMatcher]] = {}
+
+        # Memoized should_ignore results, keyed by relative path; directories
+        # are keyed with a trailing '/' and act as prefixes for their contents
+        self.MAX_IGNORE_CACHE = 10000
+        self._ignore_cache: Dict[str, bool] = {}
 
     def _load_gitignore(self) -> Optional[PathSpec]:
         """Load .gitignore patterns if the file exists."""
         gitignore_path = self.repo_path / '.gitignore'
-        patterns = []
-        
-        # Add default patterns
-        for pattern in self.default_ignore_patterns:
-            patterns.append(GitWildMatchPattern(pattern))
+        lines: List[str] = []
 
-        # Add patterns from .gitignore if it exists
-        if gitignore_path.exists() and gitignore_path.is_file():
-            try:
-                with open(gitignore_path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        # Skip empty lines and comments
-                        if line and not line.startswith('#'):
-                            patterns.append(GitWildMatchPattern(line))
-            except Exception as e:
-                print(f"Error reading .gitignore: {e}")
+        # Opening .gitignore directly saves a separate existence check, and
+        # pathspec skips blank lines and comments itself
+        try:
+            text = gitignore_path.read_text(encoding='utf-8', errors='replace')
+            self.has_gitignore = True
+            lines = text.splitlines()
+        except (FileNotFoundError, IsADirectoryError):
+            pass
+        except Exception as e:
+            print(f"Error reading .gitignore: {e}")
         
-        return PathSpec(patterns)
+        # One bad line must not discard the rest of the file
+        return _parse_gitignore(lines, '.gitignore')
+
+    def _read_nested_gitignore(self, directory: str, full_path: str) -> Optional[_IgnoreMatcher]:
+        """Compile the .gitignore in a subdirectory, never following a symlink to it."""
+        try:
+            fd = os.open(os.path.join(full_path, '.gitignore'), os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+            with open(fd, encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+        except Exception as e:
+            print(f"Error reading {directory}/.gitignore: {e}")
+            return None
+        return _compile_ignore(_parse_gitignore(lines, f"{directory}/.gitignore"))
+
+    def _load_nested_gitignore(self, directory: str) -> Optional[_IgnoreMatcher]:
+        """Return the compiled .gitignore of a subdirectory, loading it on first use.
+
+        Directories reached by the walk are registered by _scan_directory; this
+        only loads the others, such as those in paths passed to read_file.
+        """
+        try:
+            return self._spec_cache[directory]
+        except KeyError:
+            pass
+
+        matcher = None
+        full_path = os.path.join(self.repo_path, directory)
+        # Most directories have no .gitignore, which one lstat settles. Such
+        # paths are untrusted, so a directory that has one must also resolve
+        # inside the repository before it is read
+        try:
+            os.lstat(os.path.join(full_path, '.gitignore'))
+            exists = True
+        except OSError:
+            exists = False
+        if exists and _is_within_root(os.path.realpath(full_path), self._resolved_root):
+            matcher = self._read_nested_gitignore(directory, full_path)
+
+        _bounded_put(self._spec_cache, directory, matcher, self.MAX_SPEC_CACHE)
+        return matcher
 
     def _is_safe_path(self, path: Path) -> bool:
         """Check if the given path is safe (no directory traversal)."""
-        try:
-            return path.resolve().is_relative_to(self.repo_path.resolve())
-        except ValueError:
-            return False
+        return _is_within_root(os.path.realpath(path), self._resolved_root)
 
     def format_structure(self, structure: FileStructure) -> str:
         """Format the file structure into a readable string."""
-        output = []
-
-        def format_size(size: int) -> str:
-            units = ['B', 'KB', 'MB', 'GB']
-            value = float(size)
-            index = 0
-            while value >= 1024 and index < len(units) - 1:
-                value /= 1024
-                index += 1
-            return f"{value:.1f} {units[index]}"
-
-        def format_item(item: FileStructure, level: int = 0) -> None:
-            indent = '  ' * level
-            
-            if item.type == 'directory':
-                output.append(f"{indent}📁 {item.path}/")
-                
-                if item.summary:
-                    summary = item.summary
-                    output.append(
-                        f"{indent}   Contains: {summary.file_count} files, "
-                        f"{summary.dir_count} directories, "
-                        f"{format_size(summary.total_size)}"
-                    )
-                elif item.children:
-                    for child in item.children:
-                        format_item(child, level + 1)
-            else:
-                output.append(f"{indent}📄 {item.path} ({format_size(item.size or 0)})")
-
-        format_item(structure)
-        return '\n'.join(output)
+        buffer = io.StringIO()
+        _format_items(buffer, structure)
+        # Drop the newline after the last line
+        return buffer.getvalue()[:-1]
+
+    def close(self) -> None:
+        """Shut down the traversal thread pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _match_ignore(self, path: str) -> bool:
+        """Match path against the gitignore patterns without consulting the cache."""
+        # Default names are checked on the last component only; anything
+        # deeper is caught through its ignored parent
+        path = normalize_file(path)
+        name = path.rstrip('/')
+        if name.rpartition('/')[2] in self._always_ignore_basenames:
+            return True
+
+        # .gitignore files in subdirectories take precedence over the root one,
+        # deepest first, with their patterns relative to their own directory
+        directory = name
+        while '/' in directory:
+            directory = directory.rpartition('/')[0]
+            matcher = self._load_nested_gitignore(directory)
+            if matcher is not None:
+                include = _match_compiled(matcher, path[len(directory) + 1:])
+                if include is not None:
+                    return include
+
+        if self._ignore_matcher is None:
+            return self.gitignore_spec.match_file(path)
+        return _match_compiled(self._ignore_matcher, path) is True
+
+    def _cache_ignore(self, path: str, ignored: bool) -> None:
+        """Store an ignore result, evicting the oldest entry once the cache is full."""
+        _bounded_put(self._ignore_cache, path, ignored, self.MAX_IGNORE_CACHE)
 
     def should_ignore(self, path: str) -> bool:
         """Check if path should be ignored based on gitignore patterns."""
-        return self.gitignore_spec.match_file(path)
+        cache = self._ignore_cache
+        cached = cache.get(path)
+        if cached is not None:
+            return cached
+
+        # Climb to the nearest ancestor directory with a known result, or the root
+        pending = [path]
+        ignored = False
+        parent = path.rstrip('/').rpartition('/')[0]
+        while parent:
+            key = parent + '/'
+            cached = cache.get(key)
+            if cached is not None:
+                ignored = cached
+                break
+            pending.append(key)
+            parent = parent.rpartition('/')[0]
+
+        # Then fill in results downward; an ignored directory ignores
+        # everything below it
+        for key in reversed(pending):
+            if not ignored:
+                ignored = self._match_ignore(key)
+            self._cache_ignore(key, ignored)
+        return ignored
 
     def get_structure(
         self,
@@ -109,189 +371,324 @@ class RepoStructureAnalyzer:
         current_depth: int = 0,
         max_depth: Optional[int] = None
     ) -> FileStructure:
-        """Recursively get the structure of files and directories."""
+        """Get the structure of files and directories."""
         if max_depth is None:
             max_depth = self.MAX_DEPTH
 
-        # Verify path safety
+        # Verify path safety once; everything below is reached by scanning
+        # directories and never follows symlinks
         if not self._is_safe_path(current_path):
-            raise ValueError(f"Invalid path: {current_path}")
+            raise ValueError(f"Invalid path - directory traversal not allowed: {current_path}")
 
-        # Skip symbolic links
-        if current_path.is_symlink():
+        # One lstat answers both the symlink check and the file type
+        stats = os.lstat(current_path)
+        if stat.S_ISLNK(stats.st_mode):
             raise ValueError(f"Symbolic links are not supported: {current_path}")
 
-        stats = current_path.stat()
         rel_path = relative_path or current_path.name
 
-        if relative_path and self.should_ignore(relative_path):
-            raise ValueError(f"Path {relative_path} is ignored")
+        if relative_path:
+            # Directories use the same 'name/' key as in the walk
+            ignore_path = relative_path
+            if stat.S_ISDIR(stats.st_mode):
+                ignore_path = relative_path.rstrip('/') + '/'
+            if self.should_ignore(ignore_path):
+                raise ValueError(f"Path {relative_path} is ignored")
 
-        if current_path.is_file():
+        if stat.S_ISREG(stats.st_mode):
             return FileStructure(
                 path=rel_path,
-                type="file",
+                type=_T_FILE,
                 size=stats.st_size
             )
 
-        if current_path.is_dir():
-            children = []
-            summary = Summary()
+        if stat.S_ISDIR(stats.st_mode):
+            structure = FileStructure(path=rel_path, type=_T_DIR)
+            frames: List[_Frame] = []
+            # Normalized the same way as the scanned entries below it
+            directory_relative_path = str(current_path)[self._repo_prefix_len:].replace(os.sep, '/')
+            self._scan_directory(
+                structure,
+                str(current_path),
+                directory_relative_path,
+                current_depth,
+                max_depth,
+                frames
+            )
+
+            if self._pool is not None and len(frames) > 1:
+                self._walk_parallel(frames, max_depth)
+            else:
+                self._walk(frames, max_depth)
+
+            return structure
 
-            if current_depth < max_depth:
+        raise ValueError(f"Unsupported file type at {current_path}")
+
+    def _walk(self, frames: List[_Frame], max_depth: int) -> None:
+        """Walk directories depth-first from an explicit stack of frames."""
+        while frames:
+            node, path, relative_path, depth = frames.pop()
+            self._scan_directory(node, path, relative_path, depth, max_depth, frames)
+
+    def _walk_parallel(self, frames: List[_Frame], max_depth: int) -> None:
+        """Scan directories on the pool, queueing each one's subdirectories as its scan completes."""
+        # Only this thread waits on futures, so workers can never block each other
+        in_flight: Set[Future] = set()
+        while frames or in_flight:
+            while frames and len(in_flight) < self.MAX_IN_FLIGHT:
+                in_flight.add(self._pool.submit(self._scan_frame, frames.pop(), max_depth))
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
                 try:
-                    entries = list(current_path.iterdir())
-                    
-                    for entry in entries:
-                        if len(children) >= self.MAX_CHILDREN:
-                            if entry.is_file() and not entry.is_symlink():
-                                summary.file_count += 1
-                                summary.total_size += entry.stat().st_size
-                            elif entry.is_dir() and not entry.is_symlink():
-                                summary.dir_count += 1
-                            continue
-
-                        entry_relative_path = str(entry.relative_to(self.repo_path))
-
-                        try:
-                            if self.should_ignore(entry_relative_path):
-                                continue
-
-                            if entry.is_symlink():
-                                continue
-
-                            entry_stats = entry.stat()
-                            
-                            if entry.is_file():
-                                summary.file_count += 1
-                                summary.total_size += entry_stats.st_size
-                            elif entry.is_dir():
-                                summary.dir_count += 1
-
-                            child = self.get_structure(
-                                entry,
-                                entry_relative_path,
-                                current_depth + 1,
-                                max_depth
-                            )
-                            children.append(child)
+                    frames.extend(future.result())
+                except Exception as error:
+                    print(f"Error scanning directory: {error}")
+
+    def _scan_frame(self, frame: _Frame, max_depth: int) -> List[_Frame]:
+        """Scan the directory of a single frame and return the frames for its subdirectories."""
+        node, path, relative_path, depth = frame
+        child_frames: List[_Frame] = []
+        self._scan_directory(node, path, relative_path, depth, max_depth, child_frames)
+        return child_frames
+
+    def _scan_directory(
+        self,
+        node: FileStructure,
+        path: str,
+        relative_path: str,
+        depth: int,
+        max_depth: int,
+        frames: List[_Frame]
+    ) -> None:
+        """Fill in a directory node from a single scan and push frames for its subdirectories."""
+        children: List[FileStructure] = []
+        # File sizes are collected contiguously and totalled in C at the end
+        sizes = array('q')
+        dir_count = 0
+        # Past the depth limit the directory is still scanned once, but only
+        # to summarize its direct children
+        listing = depth < max_depth
+
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+
+            # Handle files (already stat-cached by scandir) before
+            # descending into any subdirectory; the sort is stable
+            if listing:
+                entries.sort(key=lambda entry: entry.is_dir(follow_symlinks=False))
+
+            # Register this directory's own .gitignore before matching its
+            # entries. The scan shows whether it has one, and the walk never
+            # follows symlinks, so the directory needs no resolving
+            if relative_path and relative_path not in self._spec_cache:
+                matcher = None
+                for entry in entries:
+                    if entry.name == '.gitignore' and entry.is_file(follow_symlinks=False):
+                        matcher = self._read_nested_gitignore(relative_path, path)
+                        break
+                _bounded_put(self._spec_cache, relative_path, matcher, self.MAX_SPEC_CACHE)
+
+            # Relative paths always use '/', as pathspec expects
+            prefix = relative_path + '/' if relative_path else ''
 
-                        except Exception as error:
-                            print(f"Error processing {entry}: {error}")
-                            continue
+            for entry in entries:
+                # Default ignores match by name alone, no pattern matching needed
+                if entry.name in self._always_ignore_basenames:
+                    continue
+
+                entry_relative_path = prefix + entry.name
+
+                try:
+                    # Types come from the cached d_type without a syscall
+                    if entry.is_symlink():
+                        continue
+                    is_dir = entry.is_dir(follow_symlinks=False)
+
+                    # Prune ignored entries before any stat or descent. Directories
+                    # are checked as 'name/', which matches them by their bare
+                    # name as well as by directory-only patterns like 'build/',
+                    # but not by 'name/**'; it is also the key should_ignore
+                    # looks up for their contents
+                    if self.should_ignore(entry_relative_path + '/' if is_dir else entry_relative_path):
+                        continue
+
+                    if is_dir:
+                        dir_count += 1
+                        if listing and len(children) < self.MAX_CHILDREN:
+                            child = FileStructure(path=entry_relative_path, type=_T_DIR)
+                            children.append(child)
+                            frames.append((child, entry.path, entry_relative_path, depth + 1))
+                        continue
+
+                    # Only non-directories are stat'ed; the mode also rules
+                    # out sockets, FIFOs and devices
+                    entry_stats = entry.stat(follow_symlinks=False)
+                    if not stat.S_ISREG(entry_stats.st_mode):
+                        continue
+                    sizes.append(entry_stats.st_size)
+                    if listing and len(children) < self.MAX_CHILDREN:
+                        children.append(FileStructure(
+                            path=entry_relative_path,
+                            type=_T_FILE,
+                            size=entry_stats.st_size
+                        ))
 
                 except Exception as error:
-                    print(f"Error reading directory {current_path}: {error}")
+                    print(f"Error processing {entry.path}: {error}")
+                    continue
 
-            return FileStructure(
-                path=rel_path,
-                type="directory",
-                children=children if children else None,
-                summary=summary if current_depth >= max_depth or len(children) >= self.MAX_CHILDREN else None
+        except Exception as error:
+            print(f"Error reading directory {path}: {error}")
+
+        node.children = children if children else None
+        # Both summaries count the direct children of this directory only
+        if not listing or len(children) >= self.MAX_CHILDREN:
+            node.summary = Summary(
+                file_count=len(sizes),
+                dir_count=dir_count,
+                total_size=sum(sizes)
             )
 
-        raise ValueError(f"Unsupported file type at {current_path}")
+# Extensive mapping of file extensions to languages
+_LANGUAGE_MAP = {
+    # Programming Languages
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.cc': 'cpp',
+    '.hpp': 'cpp',
+    '.c': 'c',
+    '.h': 'c',
+    '.cs': 'csharp',
+    '.rb': 'ruby',
+    '.php': 'php',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.swift': 'swift',
+    '.kt': 'kotlin',
+    '.scala': 'scala',
+    '.m': 'objective-c',
+    '.mm': 'objective-c',
+
+    # Web Technologies
+    '.html': 'html',
+    '.htm': 'html',
+    '.css': 'css',
+    '.scss': 'scss',
+    '.sass': 'scss',
+    '.less': 'less',
+    '.vue': 'vue',
+    '.svelte': 'svelte',
+
+    # Data & Config Files
+    '.json': 'json',
+    '.xml': 'xml',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.toml': 'toml',
+    '.ini': 'ini',
+    '.conf': 'config',
+
+    # Documentation
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+    '.rst': 'restructuredtext',
+    '.tex': 'latex',
+
+    # Shell Scripts
+    '.sh': 'shell',
+    '.bash': 'shell',
+    '.zsh': 'shell',
+    '.fish': 'shell',
+    '.bat': 'batch',
+    '.cmd': 'batch',
+    '.ps1': 'powershell',
+
+    # Other Common Types
+    '.sql': 'sql',
+    '.r': 'r',
+    '.gradle': 'gradle',
+    '.dockerfile': 'dockerfile',
+    '.env': 'env',
+    '.gitignore': 'gitignore'
+}
+
+# Files without extension but specific names
+_NAME_MAP = {
+    'dockerfile': 'dockerfile',
+    'makefile': 'makefile',
+    'jenkinsfile': 'jenkinsfile',
+    'vagrantfile': 'ruby',
+    '.env': 'env',
+    '.gitignore': 'gitignore'
+}
 
 class FileReader:
     def __init__(self, repo_path: Path):
         self.repo_path = repo_path
         self.MAX_SIZE = 1024 * 1024  # 1MB
         self.MAX_LINES = 1000  # Maximum number of lines to return
+        self.BUFFER_SIZE = 64 * 1024  # Read buffer size in bytes
+        self._resolved_root = _root_prefix(self.repo_path)
+
+    def _read_lines(self, full_path: str) -> Tuple[List[str], int]:
+        """Read up to MAX_LINES lines and count the total number of lines in the file."""
+        fd = os.open(full_path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0))
+        with os.fdopen(fd, 'rb', buffering=self.BUFFER_SIZE) as f:
+            raw_lines = list(islice(f, self.MAX_LINES + 1))
+            more = len(raw_lines) > self.MAX_LINES
+
+            # Only lines that are returned get decoded
+            text = b''.join(raw_lines[:self.MAX_LINES]).decode('utf-8')
+
+            total_lines = 0
+            if more:
+                # Count the rest in bytes: the extra line ends with b'\n' unless it hit EOF
+                last = raw_lines[-1]
+                total_lines = self.MAX_LINES + last.count(b'\n')
+                for chunk in iter(lambda: f.read(self.BUFFER_SIZE), b''):
+                    total_lines += chunk.count(b'\n')
+                    last = chunk
+                if not last.endswith(b'\n'):
+                    total_lines += 1
+
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+        lines = text.split('\n')
+        if not lines[-1]:
+            lines.pop()
+        return lines, total_lines if more else len(lines)
 
     def _detect_language(self, file_path: str) -> str:
         """Detect the programming language based on file extension."""
-        ext = Path(file_path).suffix.lower()
-        
-        # Extensive mapping of file extensions to languages
-        language_map = {
-            # Programming Languages
-            '.py': 'python',
-            '.js': 'javascript',
-            '.jsx': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.cc': 'cpp',
-            '.hpp': 'cpp',
-            '.c': 'c',
-            '.h': 'c',
-            '.cs': 'csharp',
-            '.rb': 'ruby',
-            '.php': 'php',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.swift': 'swift',
-            '.kt': 'kotlin',
-            '.scala': 'scala',
-            '.m': 'objective-c',
-            '.mm': 'objective-c',
-            
-            # Web Technologies
-            '.html': 'html',
-            '.htm': 'html',
-            '.css': 'css',
-            '.scss': 'scss',
-            '.sass': 'scss',
-            '.less': 'less',
-            '.vue': 'vue',
-            '.svelte': 'svelte',
-            
-            # Data & Config Files
-            '.json': 'json',
-            '.xml': 'xml',
-            '.yaml': 'yaml',
-            '.yml': 'yaml',
-            '.toml': 'toml',
-            '.ini': 'ini',
-            '.conf': 'config',
-            
-            # Documentation
-            '.md': 'markdown',
-            '.markdown': 'markdown',
-            '.rst': 'restructuredtext',
-            '.tex': 'latex',
-            
-            # Shell Scripts
-            '.sh': 'shell',
-            '.bash': 'shell',
-            '.zsh': 'shell',
-            '.fish': 'shell',
-            '.bat': 'batch',
-            '.cmd': 'batch',
-            '.ps1': 'powershell',
-            
-            # Other Common Types
-            '.sql': 'sql',
-            '.r': 'r',
-            '.gradle': 'gradle',
-            '.dockerfile': 'dockerfile',
-            '.env': 'env',
-            '.gitignore': 'gitignore'
-        }
-        
+        dot = file_path.rfind('.')
+        slash = max(file_path.rfind('/'), file_path.rfind('\\'))
+        if dot > slash:
+            return _LANGUAGE_MAP.get(file_path[dot:].lower(), 'text')
+
         # Handle files without extension but specific names
-        if not ext:
-            filename = Path(file_path).name.lower()
-            name_map = {
-                'dockerfile': 'dockerfile',
-                'makefile': 'makefile',
-                'jenkinsfile': 'jenkinsfile',
-                'vagrantfile': 'ruby',
-                '.env': 'env',
-                '.gitignore': 'gitignore'
-            }
-            return name_map.get(filename, 'text')
-            
-        return language_map.get(ext, 'text')
+        return _NAME_MAP.get(file_path[slash + 1:].lower(), 'text')
 
     def read_file(self, file_path: str) -> Dict[str, Union[List[Dict[str, str]], bool]]:
         """Read and format file contents for LLM consumption."""
         try:
-            full_path = self.repo_path / file_path
-            
-            # Check if path is safe
-            if not full_path.resolve().is_relative_to(self.repo_path.resolve()):
+            # Check if path is safe: a lexical check catches '..' and absolute
+            # paths, and the parent directory is resolved on every call to rule
+            # out symlinked directories, which may change between calls. The
+            # root itself has no parent to check, and the file itself is
+            # rejected below if it is a symlink.
+            full_path = os.path.normpath(os.path.join(self._resolved_root, file_path))
+            if not (_is_within_root(full_path, self._resolved_root)
+                    and (full_path == self._resolved_root[:-1]
+                         or _is_within_root(os.path.realpath(os.path.dirname(full_path)), self._resolved_root))):
                 return {
                     "content": [{
                         "type": "text",
@@ -300,8 +697,10 @@ class FileReader:
                     "isError": True
                 }
             
-            # Check if file exists
-            if not full_path.exists():
+            # A single lstat answers existence, file type and size
+            try:
+                stats = os.lstat(full_path)
+            except (FileNotFoundError, NotADirectoryError):
                 return {
                     "content": [{
                         "type": "text",
@@ -311,7 +710,7 @@ class FileReader:
                 }
             
             # Check if it's a symbolic link
-            if full_path.is_symlink():
+            if stat.S_ISLNK(stats.st_mode):
                 return {
                     "content": [{
                         "type": "text",
@@ -320,8 +719,15 @@ class FileReader:
                     "isError": True
                 }
             
-            # Get file stats
-            stats = full_path.stat()
+            # Only regular files can be read
+            if not stat.S_ISREG(stats.st_mode):
+                return {
+                    "content": [{
+                        "type": "text",
+                        "text": f"Error: {file_path} is not a regular file"
+                    }],
+                    "isError": True
+                }
             
             # Check file size
             if stats.st_size > self.MAX_SIZE:
@@ -335,20 +741,10 @@ class FileReader:
                 }
             
             # Read file content with line limit
-            lines = []
-            line_count = 0
-            truncated = False
-            
-            with open(full_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line_count += 1
-                    if line_count <= self.MAX_LINES:
-                        lines.append(line.rstrip('\n'))
-                    else:
-                        truncated = True
-                        break
+            lines, line_count = self._read_lines(full_path)
+            truncated = line_count > self.MAX_LINES
             
-            content = '\n'.join(lines)
+            content = '\n'.join(lines[:self.MAX_LINES])
             if truncated:
                 content += f"\n\n[File truncated after {self.MAX_LINES} lines]"
             
@@ -397,6 +793,11 @@ class CodeAnalysisServer(FastMCP):
         self.analyzer: Optional[RepoStructureAnalyzer] = None
         self.file_reader: Optional[FileReader] = None
 
+        # Repository metadata cached at initialization; see refresh()
+        self._exists = False
+        self._is_dir = False
+        self._gitignore_exists = False
+
         # Add prompts capability
         # self.capabilities["prompts"] = {}
 
@@ -408,15 +809,35 @@ class CodeAnalysisServer(FastMCP):
         repo_path = Path(path).resolve()
         if not repo_path.is_absolute():
             raise ValueError(f"Repository path must be absolute, got: {repo_path}")
-        if not repo_path.exists():
+        try:
+            repo_stats = os.stat(repo_path)
+        except OSError as e:
+            # The same errors Path.exists() treats as a missing path
+            if e.errno not in (errno.ENOENT, errno.ENOTDIR, errno.ELOOP):
+                raise
             raise ValueError(f"Repository path does not exist: {repo_path}")
-        if not repo_path.is_dir():
+        if not stat.S_ISDIR(repo_stats.st_mode):
             raise ValueError(f"Repository path is not a directory: {repo_path}")
         
         self.repo_path = repo_path
+        if self.analyzer:
+            self.analyzer.close()
         self.analyzer = RepoStructureAnalyzer(self.repo_path)
         self.file_reader = FileReader(self.repo_path)
 
+        # Validated above, and the analyzer already looked for a .gitignore
+        self._exists = True
+        self._is_dir = True
+        self._gitignore_exists = self.analyzer.has_gitignore
+
+    def refresh(self) -> None:
+        """Re-read the cached repository metadata from the filesystem."""
+        if not self.repo_path:
+            return
+        self._exists = self.repo_path.exists()
+        self._is_dir = self.repo_path.is_dir()
+        self._gitignore_exists = (self.repo_path / '.gitignore').exists()
+
 # Initialize server
 mcp = CodeAnalysisServer("code-analysis")
 
@@ -429,8 +850,7 @@ async def initialize_repository(path: str) -> str:
     """
     try:
         mcp.initialize_repo(path)
-        gitignore_path = Path(path) / '.gitignore'
-        gitignore_status = "Found .gitignore file" if gitignore_path.exists() else "No .gitignore file present"
+        gitignore_status = "Found .gitignore file" if mcp._gitignore_exists else "No .gitignore file present"
         return f"Successfully initialized code repository at: {mcp.repo_path}\n{gitignore_status}"
     except ValueError as e:
         return f"Error initializing code repository: {str(e)}"
@@ -441,13 +861,12 @@ async def get_repo_info() -> str:
     if not mcp.repo_path:
         return "No code repository has been initialized yet. Please use initialize_repository first."
     
-    gitignore_path = mcp.repo_path / '.gitignore'
-    gitignore_status = "Found .gitignore file" if gitignore_path.exists() else "No .gitignore file present"
+    gitignore_status = "Found .gitignore file" if mcp._gitignore_exists else "No .gitignore file present"
     
     return f"""Code Repository Information:
 Path: {mcp.repo_path}
-Exists: {mcp.repo_path.exists()}
-Is Directory: {mcp.repo_path.is_dir()}
+Exists: {mcp._exists}
+Is Directory: {mcp._is_dir}
 {gitignore_status}"""
 
 @mcp.tool()
@@ -462,13 +881,12 @@ async def get_repo_structure(sub_path: Optional[str] = None, depth: Optional[int
         return "No code repository has been initialized yet. Please use initialize_repository first."
 
     try:
-        target_path = mcp.repo_path
-        if sub_path:
-            target_path = mcp.repo_path / sub_path
-            if not mcp.analyzer._is_safe_path(target_path):
-                return "Error: Invalid path - directory traversal not allowed"
+        # get_structure rejects paths outside the repository itself
+        target_path = mcp.repo_path / sub_path if sub_path else mcp.repo_path
 
-        structure = mcp.analyzer.get_structure(
+        # The walk blocks on filesystem calls, so keep it off the event loop
+        structure = await asyncio.to_thread(
+            mcp.analyzer.get_structure,
             target_path,
             sub_path or '',
             max_depth=depth
@@ -488,11 +906,13 @@ async def read_file(file_path: str) -> str:
         return "No code repository has been initialized yet. Please use initialize_repository first."
 
     try:
-        # Check if file should be ignored based on gitignore patterns
-        if mcp.analyzer.should_ignore(file_path):
+        # Check if file should be ignored based on gitignore patterns; matching
+        # may load nested .gitignore files, so it also runs in a worker thread
+        if await asyncio.to_thread(mcp.analyzer.should_ignore, file_path):
             return f"File {file_path} is ignored based on .gitignore patterns"
 
-        result = mcp.file_reader.read_file(file_path)
+        # Like the structure walk, reading blocks on file I/O
+        result = await asyncio.to_thread(mcp.file_reader.read_file, file_path)
         
         if result.get("isError", False):
             return result["content"][0]["text"]
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+
+from code_analysis import FileReader
+
+
+def _read(tmp_path: Path, data: bytes) -> str:
+    (tmp_path / 'f.txt').write_bytes(data)
+    return FileReader(tmp_path).read_file('f.txt')['content'][0]['text']
+
+
+def _body(text: str) -> str:
+    return text.split('\n\n', 1)[1]
+
+
+def test_exactly_max_lines_is_not_truncated(tmp_path):
+    text = _read(tmp_path, b''.join(b'line %d\n' % i for i in range(1000)))
+    assert 'Total lines: 1000\n' in text
+    assert 'truncated' not in text
+    assert _body(text).split('\n')[-1] == 'line 999'
+
+
+def test_one_line_over_max_is_truncated(tmp_path):
+    text = _read(tmp_path, b''.join(b'line %d\n' % i for i in range(1001)))
+    assert 'Total lines: 1001\n' in text
+    assert text.endswith('line 999\n\n[File truncated after 1000 lines]')
+
+
+def test_truncated_file_reports_true_line_count(tmp_path):
+    text = _read(tmp_path, b''.join(b'line %d\n' % i for i in range(5000)))
+    assert 'Total lines: 5000\n' in text
+    assert text.endswith('[File truncated after 1000 lines]')
+
+
+@pytest.mark.parametrize('data, lines', [
+    (b'a\nb', ['a', 'b']),
+    (b'a\nb\n', ['a', 'b']),
+    (b'a\r\nb\r\n', ['a', 'b']),
+    (b'a\r\nb', ['a', 'b']),
+    (b'a\rb\n', ['a', 'b']),
+])
+def test_line_endings(tmp_path, data, lines):
+    text = _read(tmp_path, data)
+    assert f'Total lines: {len(lines)}\n' in text
+    assert _body(text) == '\n'.join(lines)
+
+
+def test_truncated_count_without_trailing_newline(tmp_path):
+    text = _read(tmp_path, b'x\n' * 1500 + b'last')
+    assert 'Total lines: 1501\n' in text
+
+
+def test_binary_within_returned_lines(tmp_path):
+    text = _read(tmp_path, b'ok\n\xff\xfe\n')
+    assert text == 'Error: File f.txt appears to be a binary file'
+
+
+def test_binary_tail_past_returned_lines_is_text(tmp_path):
+    # Only returned lines are decoded, so bytes after line 1000 don't matter
+    text = _read(tmp_path, b'x\n' * 1000 + b'\xff\xfe\n')
+    assert 'Total lines: 1001\n' in text
+    assert text.endswith('[File truncated after 1000 lines]')
+
+
+@pytest.mark.parametrize('file_path', ['', '.', './', 'sub/..'])
+def test_repository_root_is_not_a_regular_file(tmp_path, file_path):
+    (tmp_path / 'sub').mkdir()
+    text = FileReader(tmp_path).read_file(file_path)['content'][0]['text']
+    assert text == f'Error: {file_path} is not a regular file'
+
+
+def test_symlinked_parent_outside_repository(tmp_path):
+    repo = tmp_path / 'repo'
+    outside = tmp_path / 'outside'
+    repo.mkdir()
+    outside.mkdir()
+    (outside / 'f.txt').write_text('secret')
+    (repo / 'link').symlink_to(outside)
+    text = FileReader(repo).read_file('link/f.txt')['content'][0]['text']
+    assert text == 'Error: Attempted to access file outside repository: link/f.txt'
@@ -0,0 +1,187 @@
+from pathlib import Path
+
+import pytest
+
+from code_analysis import RepoStructureAnalyzer
+
+
+def _write(path: Path, text: str = '') -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _walk_paths(structure) -> set:
+    paths = set()
+    stack = [structure]
+    while stack:
+        item = stack.pop()
+        paths.add(item.path)
+        stack.extend(item.children or ())
+    return paths
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    _write(tmp_path / '.gitignore', '*.log\n')
+    _write(tmp_path / 'a' / '.gitignore', '!keep.log\ntmp/\n/only.txt\n!\n')
+    _write(tmp_path / 'a' / 'b' / '.gitignore', 'keep.log\n')
+    for name in (
+        'a/x.log', 'a/keep.log', 'a/only.txt', 'a/tmp/f.txt', 'a/c/tmp',
+        'a/b/keep.log', 'a/b/only.txt', 'a/b/tmp/g.txt', 'c/keep.log', 'c/m.py',
+    ):
+        _write(tmp_path / name)
+    return tmp_path
+
+
+@pytest.fixture
+def analyzer(repo: Path):
+    analyzer = RepoStructureAnalyzer(repo, parallel=False)
+    yield analyzer
+    analyzer.close()
+
+
+@pytest.mark.parametrize('path, ignored', [
+    # Root patterns still apply where no nested file decides
+    ('a/x.log', True),
+    ('c/keep.log', True),
+    ('c/m.py', False),
+    # A nested negation overrides the root pattern
+    ('a/keep.log', False),
+    # The deepest .gitignore wins over its parents
+    ('a/b/keep.log', True),
+    # Anchored patterns are relative to their own directory
+    ('a/only.txt', True),
+    ('a/b/only.txt', False),
+    # Directory-only patterns match directory keys, and through them their contents
+    ('a/tmp/', True),
+    ('a/tmp/f.txt', True),
+    ('a/b/tmp/', True),
+    ('a/b/tmp/g.txt', True),
+    ('a/c/tmp', False),
+])
+def test_should_ignore_nested(analyzer, path, ignored):
+    assert analyzer.should_ignore(path) is ignored
+
+
+def test_walk_applies_nested_gitignore(repo, analyzer):
+    paths = _walk_paths(analyzer.get_structure(repo, max_depth=5))
+    assert {'a/keep.log', 'a/c/tmp', 'a/b/only.txt', 'c/m.py'} <= paths
+    assert not paths & {'a/x.log', 'a/only.txt', 'a/tmp', 'a/b/keep.log', 'a/b/tmp', 'c/keep.log'}
+
+
+def test_invalid_nested_pattern_keeps_the_rest(analyzer):
+    # a/.gitignore ends with a lone '!', which is skipped on its own
+    assert analyzer._load_nested_gitignore('a') is not None
+    assert analyzer.should_ignore('a/only.txt')
+
+
+@pytest.mark.parametrize('gitignore, path, ignored', [
+    # Nothing below an excluded directory can be re-included
+    ('build/\n!build/x\n', 'build/', True),
+    ('build/\n!build/x\n', 'build/x', True),
+    ('logs\n!logs/a.log\n', 'logs/', True),
+    ('logs\n!logs/a.log\n', 'logs/a.log', True),
+    # 'foo/**' matches what is inside foo but not foo itself, so negations apply
+    ('foo/**\n!foo/keep.txt\n', 'foo/', False),
+    ('foo/**\n!foo/keep.txt\n', 'foo/keep.txt', False),
+    ('foo/**\n!foo/keep.txt\n', 'foo/other.txt', True),
+    ('foo/**\n!foo/keep.txt\n', 'foo/sub/', True),
+])
+def test_should_ignore_excluded_parent(tmp_path, gitignore, path, ignored):
+    _write(tmp_path / '.gitignore', gitignore)
+    analyzer = RepoStructureAnalyzer(tmp_path, parallel=False)
+    try:
+        assert analyzer.should_ignore(path) is ignored
+    finally:
+        analyzer.close()
+
+
+def test_walk_keeps_negated_file_under_double_star(tmp_path):
+    _write(tmp_path / '.gitignore', 'foo/**\n!foo/keep.txt\n')
+    _write(tmp_path / 'foo' / 'keep.txt')
+    _write(tmp_path / 'foo' / 'other.txt')
+    analyzer = RepoStructureAnalyzer(tmp_path, parallel=False)
+    try:
+        paths = _walk_paths(analyzer.get_structure(tmp_path))
+    finally:
+        analyzer.close()
+    assert {'foo', 'foo/keep.txt'} <= paths
+    assert 'foo/other.txt' not in paths
+
+
+def test_should_ignore_deep_path_without_recursion(analyzer):
+    # Deeper than the interpreter's recursion limit, on a cold cache
+    deep = '/'.join(['d'] * 1200)
+    assert analyzer.should_ignore(deep + '/f.log') is True
+    assert analyzer.should_ignore(deep + '/f.txt') is False
+
+
+@pytest.mark.parametrize('gitignore, sub_path, ignored', [
+    ('build/\n', 'build', True),
+    ('build\n', 'build/', True),
+    ('build/**\n', 'build', False),
+])
+def test_get_structure_directory_sub_path(tmp_path, gitignore, sub_path, ignored):
+    _write(tmp_path / '.gitignore', gitignore)
+    _write(tmp_path / 'build' / 'keep.txt')
+    analyzer = RepoStructureAnalyzer(tmp_path, parallel=False)
+    try:
+        if ignored:
+            with pytest.raises(ValueError, match='is ignored'):
+                analyzer.get_structure(tmp_path / sub_path, sub_path)
+        else:
+            assert analyzer.get_structure(tmp_path / sub_path, sub_path).path == sub_path
+    finally:
+        analyzer.close()
+
+
+_FILE_PATHS = (
+    'a', 'b', 'a/b', 'b/a', 'a/b/c', 'x.log', 'a/x.log', 'keep.log',
+    'b/c', 'xy', 'a/a', 'c/b/c', 'src/a/mod.py', 'doc/readme.md',
+)
+
+
+@pytest.mark.parametrize('gitignore', [
+    '*.log\n',
+    '*.log\n!keep.log\n',
+    # Negation order decides: the last matching pattern wins
+    '!a\na\n',
+    'a\n!a\n',
+    'a\n!a\na\n',
+    '*.log\n!*.log\nx.log\n',
+    'a/\n!a/b\n',
+    'a/**\n!a/b/c\n',
+    '/b\n**/c\n!c/b/c\n',
+    'a/*\nx?\n[ab]\n!/a/b\n',
+    'src/**/*.py\n!src/a/\n# comment\n\ndoc/\n',
+])
+def test_match_ignore_agrees_with_pathspec(tmp_path, gitignore):
+    _write(tmp_path / '.gitignore', gitignore)
+    analyzer = RepoStructureAnalyzer(tmp_path, parallel=False)
+    try:
+        for path in _FILE_PATHS:
+            assert analyzer._match_ignore(path) == analyzer.gitignore_spec.match_file(path), path
+    finally:
+        analyzer.close()
+
+
+def test_spec_cache_is_bounded(repo, analyzer):
+    analyzer.MAX_SPEC_CACHE = 3
+    for i in range(10):
+        analyzer.should_ignore(f'c/d{i}/f.txt')
+    assert len(analyzer._spec_cache) <= 3
+    # Evicted directories are loaded again when needed
+    assert analyzer.should_ignore('a/b/keep.log') is True
+    assert analyzer.should_ignore('a/keep.log') is False
+
+
+def test_nested_gitignore_outside_repository_is_not_read(tmp_path):
+    repo = tmp_path / 'repo'
+    _write(tmp_path / 'outside' / '.gitignore', '*.txt\n')
+    repo.mkdir()
+    (repo / 'link').symlink_to(tmp_path / 'outside')
+    analyzer = RepoStructureAnalyzer(repo, parallel=False)
+    try:
+        assert analyzer.should_ignore('link/f.txt') is False
+    finally:
+        analyzer.close()